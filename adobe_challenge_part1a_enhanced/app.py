@@ -2,7 +2,15 @@ import fitz  # PyMuPDF
 import json
 import re
 import nltk
-from collections import Counter
+import numpy as np
+from numba import njit
+from functools import lru_cache
+from rapidfuzz import process
+from rapidfuzz.distance import Levenshtein
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Fall back to the stdlib json module
 from config import (
     HEADING_FONT_SIZE_THRESHOLDS,
     HEADING_KEYWORDS,
@@ -10,18 +18,121 @@ from config import (
 )
 
 # Download required NLTK data (only if not already present)
-try:
-    nltk.data.find("tokenizers/punkt")
-except LookupError:
-    nltk.download("punkt", quiet=True)
-
 try:
     nltk.data.find("corpora/stopwords")
 except LookupError:
     nltk.download("stopwords", quiet=True)
 
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
+
+# Heading keywords of every level as one lookup set (stopwords removed once)
+_STOPWORDS = frozenset(stopwords.words("english"))
+_ALL_KEYWORDS = frozenset(kw for kws in HEADING_KEYWORDS.values() for kw in kws) - _STOPWORDS
+# Whole alphabetic tokens only, so "sub-section" or "chapter1" do not yield keywords
+_WORD_PATTERN = re.compile(r"(?<![\w-])[a-z]+(?![\w-])")
+
+# Heading patterns, ordered by likelihood (compiled once, matched per span)
+_HEADING_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r"^\d+(\.\d+)*\s+[A-Z]",  # Numbered sections like "1. Introduction" or "1.1.1 Sub-section"
+    r"^(Chapter|Section|Part|Assignment|Exercise|Lab|Practical|Experiment)\s+\d+\b",
+    r"^(Introduction|Conclusion|Summary|Overview|Background|Methodology|Results|Discussion|Aim|Theory|Problem statement|Assignment No)",
+)]
+_TITLE_CASE_PATTERN = re.compile(r"^[A-Z][a-z]+(\s+[A-Z][a-z]+)*$")
+
+@lru_cache(maxsize=None)
+def _compile_ignore_patterns(patterns):
+    """Combine a tuple of ignore patterns into one alternation, compiled once
+    per distinct configuration, so each span needs a single match() call"""
+    if not patterns:
+        return re.compile(r"(?!)")  # Matches nothing
+    return re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+
+@lru_cache(maxsize=4096)
+def _text_distance(a, b, score_cutoff=None):
+    """Normalized Levenshtein distance (0..1) between two lowercased strings.
+    Distances above score_cutoff abort early and are reported as 1.0."""
+    return Levenshtein.normalized_distance(a, b, score_cutoff=score_cutoff)
+
+# Text-only extraction: no image blocks, no ligature preservation
+_TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+
+# Heading level by font score tier; tier 0 falls back to H3
+_LEVEL_NAMES = ("H3", "H3", "H2", "H1")
+
+# Levels whose entries make a similar lower-level heading on the same page redundant
+_HIGHER_LEVELS = {"H1": (), "H2": ("H1",), "H3": ("H1", "H2")}
+
+@njit(cache=True)
+def _classify_level(size, dominant, page_height, h1m, h2m, h3m, h1t, h2t, h3t, min_ratio_h):
+    """
+    Font score and level tier of one span from a single size tiering.
+    Relative tiers (vs. the page's dominant size) win; otherwise absolute
+    thresholds apply, scored only above the minimum size for the page.
+    """
+    # Prioritize larger font sizes relative to dominant text
+    if dominant > 0:
+        if size >= dominant * h1m:
+            return 3, 3
+        if size >= dominant * h2m:
+            return 2, 2
+        if size >= dominant * h3m:
+            return 1, 1
+
+    # Fallback to absolute thresholds if dominant size is not useful or too small
+    absolute_tier = 0
+    if size >= h1t:
+        absolute_tier = 3
+    elif size >= h2t:
+        absolute_tier = 2
+    elif size >= h3t:
+        absolute_tier = 1
+    font_score = absolute_tier if size >= min_ratio_h * page_height else 0
+
+    # Pages with a dominant size default to H3 when only the fallback matched
+    return font_score, (0 if dominant > 0 else absolute_tier)
+
+@njit(cache=True)
+def _score_headings(sizes, flags, x0, x1, page_ids, page_dominants, page_widths, page_heights,
+                    h1m, h2m, h3m, h1t, h2t, h3t, min_ratio_h):
+    """
+    Numeric heading features for every span in one compiled pass.
+    Returns (font_scores, level_tiers, base_scores, is_bold): font score
+    0-3, level tier indexing _LEVEL_NAMES, font score times bold/position
+    bonuses, and the bold flag. Rows with a zero font score are left at 0.
+    """
+    n = sizes.shape[0]
+    font_scores = np.zeros(n, dtype=np.int64)
+    level_tiers = np.zeros(n, dtype=np.int64)
+    base_scores = np.zeros(n, dtype=np.float64)
+    is_bold = np.zeros(n, dtype=np.bool_)
+
+    for i in range(n):
+        page = page_ids[i]
+        font_score, level_tier = _classify_level(
+            sizes[i], page_dominants[page], page_heights[page],
+            h1m, h2m, h3m, h1t, h2t, h3t, min_ratio_h)
+        if font_score == 0:
+            continue
+        font_scores[i] = font_score
+        level_tiers[i] = level_tier
+
+        bold = (flags[i] & 1) > 0
+        is_bold[i] = bold
+        width = page_widths[page]
+        x_center = (x0[i] + x1[i]) / 2
+        is_aligned = x0[i] < width * 0.2 or abs(x_center - width / 2) < width * 0.1
+        base_scores[i] = font_score * (1.5 if bold else 1.0) * (1.2 if is_aligned else 1.0)
+
+    return font_scores, level_tiers, base_scores, is_bold
+
+def write_json(path, data):
+    """Write data as indented UTF-8 JSON, using orjson when it is installed"""
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
 
 def is_bold(span):
     return (span["flags"] & 1) > 0
@@ -41,53 +152,58 @@ def is_likely_heading(text, config, font_size, dominant_font_size, is_bold_text,
     - Relative font size and boldness
     - Position on page (for title candidates)
     """
-    text = text.strip()
-    if not text or len(text) < config["min_heading_chars"]:
-        return False
-    
-    if len(text) > config["max_heading_chars"]:
+    return _is_likely_heading(
+        text.strip(), font_size, dominant_font_size, is_bold_text, is_title_candidate,
+        config["min_heading_chars"], config["max_heading_chars"],
+        _compile_ignore_patterns(tuple(config["ignore_patterns"]))
+    )
+
+@lru_cache(maxsize=8192)
+def _is_likely_heading(text, font_size, dominant_font_size, is_bold_text, is_title_candidate, min_chars, max_chars, ignore_re):
+    """Cached core of is_likely_heading; the same span texts recur across pages"""
+    # Cheap length bounds first; words are only split by branches that need them
+    len_text = len(text)
+    if not text or len_text < min_chars or len_text > max_chars:
         return False
     
     # Filter out common non-heading patterns early
-    if any(re.match(pattern, text, re.IGNORECASE) for pattern in config["ignore_patterns"]):
+    if ignore_re.match(text):
         return False
 
     # Check for common heading patterns (more specific and ordered by likelihood)
-    heading_patterns = [
-        r"^\d+(\.\d+)*\s+[A-Z]",  # Numbered sections like "1. Introduction" or "1.1.1 Sub-section"
-        r"^(Chapter|Section|Part|Assignment|Exercise|Lab|Practical|Experiment)\s+\d+\b",
-        r"^(Introduction|Conclusion|Summary|Overview|Background|Methodology|Results|Discussion|Aim|Theory|Problem statement|Assignment No)",
-    ]
-    
-    for pattern in heading_patterns:
-        if re.match(pattern, text, re.IGNORECASE):
-            return True
+    if any(p.match(text) for p in _HEADING_PATTERNS):
+        return True
     
+    is_upper = text.isupper()
+    words = None
+
     # Title-specific patterns (more lenient for title page)
     if is_title_candidate:
-        if text.isupper() and len(text.split()) <= 5: # Short all-caps phrases
-            return True
-        if re.match(r"^[A-Z][a-z]+(\s+[A-Z][a-z]+)*$", text) and len(text.split()) <= 7: # Title case
-            return True
+        if is_upper:
+            words = text.split()
+            if len(words) <= 5: # Short all-caps phrases
+                return True
+        if _TITLE_CASE_PATTERN.match(text):
+            words = words or text.split()
+            if len(words) <= 7: # Title case
+                return True
 
     # General heading patterns
     # All caps text (e.g., "THIRD YEAR", "LABORATORY MANUAL") - more strict for general headings
-    if text.isupper() and len(text.split()) <= 4 and len(text) > 5:
-        return True
+    if is_upper and len_text > 5:
+        words = words or text.split()
+        if len(words) <= 4:
+            return True
 
     # Title case (e.g., "Human Computer Interaction") - more strict for general headings
-    words = text.split()
-    if 1 <= len(words) <= 6 and all(word[0].isupper() if word else False for word in words) and not text.isupper():
-        return True
+    if not is_upper and text[0].isupper():
+        words = words or text.split()
+        if len(words) <= 6 and all(word[0].isupper() for word in words):
+            return True
 
     # Keyword-based semantic scoring (more targeted)
-    tokens = word_tokenize(text.lower())
-    stop_words = set(stopwords.words("english"))
-    filtered_tokens = [w for w in tokens if not w in stop_words and w.isalpha()]
-
-    for level, keywords in HEADING_KEYWORDS.items():
-        if any(keyword in filtered_tokens for keyword in keywords):
-            return True
+    if not _ALL_KEYWORDS.isdisjoint(_WORD_PATTERN.findall(text.lower())):
+        return True
     
     # Consider relative font size and boldness as a strong indicator
     if dominant_font_size > 0 and font_size > dominant_font_size * 1.2 and is_bold_text:
@@ -95,8 +211,9 @@ def is_likely_heading(text, config, font_size, dominant_font_size, is_bold_text,
 
     return False
 
-def extract_outline(pdf_path, config=None):
-    doc = fitz.open(pdf_path)
+def extract_outline(doc, config=None):
+    """Extract title and H1-H3 outline from an open PyMuPDF document.
+    The caller owns the document and is responsible for closing it."""
     outline = []
     title = ""
 
@@ -108,92 +225,148 @@ def extract_outline(pdf_path, config=None):
     # Use HEADING_FONT_SIZE_THRESHOLDS from config.py
     h_thresholds = HEADING_FONT_SIZE_THRESHOLDS
 
-    # Calculate dominant font size for each page
-    page_dominant_font_sizes = {}
-    for page_num in range(len(doc)):
-        page = doc.load_page(page_num)
-        font_sizes = []
-        for block in page.get_text("dict")["blocks"]:
-            if "lines" in block:
-                for line in block["lines"]:
-                    for span in line["spans"]:
-                        font_sizes.append(span["size"])
-        if font_sizes:
-            page_dominant_font_sizes[page_num] = Counter(font_sizes).most_common(1)[0][0]
-        else:
-            page_dominant_font_sizes[page_num] = 0
-
     # 1. Enhanced Title Extraction
     # Try metadata first, then multi-page heuristic analysis
     if doc.metadata and doc.metadata.get("title") and doc.metadata.get("title").strip() not in ["gdsgsdfg", ""]:
         title = doc.metadata.get("title").strip()
 
-    if not title:
+    # Single pass over the document: each page's text dict is parsed once and
+    # used for the dominant font size, title candidates and heading spans.
+    # Span features are collected as parallel columns (structure of arrays)
+    # so heading scoring can run vectorized over the whole document.
+    page_dominant_font_sizes = []
+    page_heights = []
+    page_widths = []
+    title_candidates = []
+    span_texts = []
+    span_sizes = []
+    span_flags = []
+    span_pages = []
+    span_x0 = []
+    span_x1 = []
+    span_y0 = []
+    min_heading_ratio = current_config["min_heading_font_size_ratio"]
+    min_absolute_size = min(h_thresholds.values())
+    min_multiplier = min(current_config["h1_font_size_multiplier"],
+                         current_config["h2_font_size_multiplier"],
+                         current_config["h3_font_size_multiplier"])
+    for page_num, page in enumerate(doc):
+        text_blocks = page.get_text("dict", flags=_TEXT_FLAGS, sort=False)["blocks"]
+        page_rect = page.rect  # Computed by PyMuPDF on each access
+        page_height = page_rect.height
+        page_width = page_rect.width
+        page_heights.append(page_height)
+        page_widths.append(page_width)
+        is_title_page = not title and page_num < current_config["title_search_pages"]
+
+        # Running font-size histogram (for the page's dominant size), plus the
+        # largest span size of each text block
+        size_counts = {}
+        sized_blocks = []
+        for block in text_blocks:
+            if block["type"] != 0:  # Text blocks only
+                continue
+            block_max_size = 0
+            for line in block["lines"]:
+                for span in line["spans"]:
+                    size = span["size"]
+                    size_counts[size] = size_counts.get(size, 0) + 1
+                    if size > block_max_size:
+                        block_max_size = size
+            sized_blocks.append((block_max_size, block))
+
+        # max() keeps the first-inserted size among ties, like Counter.most_common
+        dominant_size = max(size_counts, key=size_counts.get) if size_counts else 0
+        page_dominant_font_sizes.append(dominant_size)
+
+        # Smallest span size that can still get a non-zero font score (see
+        # _classify_level) or qualify as a title; blocks below both are body text
+        min_heading_size = max(page_height * min_heading_ratio, min_absolute_size)
+        if dominant_size > 0:
+            min_heading_size = min(min_heading_size, dominant_size * min_multiplier)
+        min_title_size = page_height * current_config["min_title_font_size_ratio"]
+
+        title_spans = []
+        for block_max_size, block in sized_blocks:
+            if block_max_size >= min_heading_size:
+                for line in block["lines"]:
+                    for span in line["spans"]:
+                        bbox = span["bbox"]
+                        span_texts.append(span["text"].strip())
+                        span_sizes.append(span["size"])
+                        span_flags.append(span["flags"])
+                        span_pages.append(page_num)
+                        span_x0.append(bbox[0])
+                        span_x1.append(bbox[2])
+                        span_y0.append(bbox[1])
+            if is_title_page and block_max_size > min_title_size:
+                for line in block["lines"]:
+                    title_spans.extend(line["spans"])
+
         # Analyze first few pages for a prominent title
-        title_candidates = []
-        
-        for page_num in range(min(current_config["title_search_pages"], len(doc))): # Check first few pages
-            page = doc.load_page(page_num)
-            text_blocks = page.get_text("dict")["blocks"]
-            page_height = page.rect.height
-            page_width = page.rect.width
-
-            for block in text_blocks:
-                if "lines" in block: 
-                    for line in block["lines"]:
-                        for span in line["spans"]:
-                            font_size = span["size"]
-                            text = span["text"].strip()
-                            bbox = span["bbox"]
-                            
-                            # Calculate position score (center-weighted, top-weighted)
-                            x_center = (bbox[0] + bbox[2]) / 2
-                            y_pos = bbox[1]
-                            center_score = 1 - abs(x_center - page_width/2) / (page_width/2)
-                            top_score = 1 - y_pos / page_height
-                            position_score = (center_score * 0.7 + top_score * 0.3) # More weight to horizontal center
-                            
-                            # Only consider text that is large enough and not just numbers/short words
-                            if (font_size > page_height * current_config["min_title_font_size_ratio"] and 
-                                len(text) > current_config["min_heading_chars"] and 
-                                not text.isdigit() and
-                                position_score > current_config["min_title_position_score"] and
-                                is_likely_heading(text, current_config, font_size, page_dominant_font_sizes.get(page_num, 0), is_bold(span), page_height, is_title_candidate=True)): 
-                                
-                                title_candidates.append({
-                                    "text": text,
-                                    "font_size": font_size,
-                                    "position_score": position_score,
-                                    "page": page_num + 1,
-                                    "is_bold": is_bold(span),
-                                    "y_pos": y_pos
-                                })
-        
+        for span in title_spans:
+            font_size = span["size"]
+            text = span["text"].strip()
+            bbox = span["bbox"]
+            is_bold_text = (span["flags"] & 1) > 0
+            
+            # Calculate position score (center-weighted, top-weighted)
+            x_center = 0.5 * (bbox[0] + bbox[2])
+            y_pos = bbox[1]
+            center_score = 1 - abs(x_center - page_width/2) / (page_width/2)
+            top_score = 1 - y_pos / page_height
+            position_score = (center_score * 0.7 + top_score * 0.3) # More weight to horizontal center
+            
+            # Only consider text that is large enough and not just numbers/short words
+            if (font_size > page_height * current_config["min_title_font_size_ratio"] and 
+                len(text) > current_config["min_heading_chars"] and 
+                not text.isdigit() and
+                position_score > current_config["min_title_position_score"] and
+                is_likely_heading(text, current_config, font_size, dominant_size, is_bold_text, page_height, is_title_candidate=True)): 
+                
+                title_candidates.append({
+                    "text": text,
+                    "font_size": font_size,
+                    "position_score": position_score,
+                    "page": page_num + 1,
+                    "is_bold": is_bold_text,
+                    "y_pos": y_pos,
+                    "is_heading_like": True  # Passed is_likely_heading above
+                })
+
+    if not title:
         # Score and select best title candidate
         if title_candidates:
             # Sort by font size first, then position, then boldness
             title_candidates.sort(key=lambda x: (x["font_size"], x["position_score"], x["is_bold"]), reverse=True)
             
-            # Filter out candidates that are too close to each other vertically, keeping the highest scored
-            filtered_candidates = []
-            for candidate in title_candidates:
-                is_duplicate = False
-                for existing in filtered_candidates:
-                    # If texts are similar and on the same page, and y_pos is close
-                    if (candidate["page"] == existing["page"] and 
-                       abs(candidate["y_pos"] - existing["y_pos"]) < current_config["line_height_threshold_ratio"] * candidate["font_size"] and 
-                       nltk.edit_distance(candidate["text"].lower(), existing["text"].lower()) < max(len(candidate["text"]), len(existing["text"])) * 0.3):
-                        is_duplicate = True
-                        break
-                if not is_duplicate:
-                    filtered_candidates.append(candidate)
+            # Filter out candidates that are too close to each other vertically, keeping the highest scored.
+            # Pairwise text distances are computed in one batched call; near[i, j] marks
+            # candidate j as a duplicate source for candidate i (similar texts on the
+            # same page with close y_pos)
+            texts = [c["text"].lower() for c in title_candidates]
+            pages = np.array([c["page"] for c in title_candidates])
+            y_positions = np.array([c["y_pos"] for c in title_candidates])
+            font_sizes = np.array([c["font_size"] for c in title_candidates])
+            distances = process.cdist(texts, texts, scorer=Levenshtein.normalized_distance, dtype=np.float64)
+            near = ((pages[:, None] == pages[None, :]) &
+                    (np.abs(y_positions[:, None] - y_positions[None, :])
+                     < current_config["line_height_threshold_ratio"] * font_sizes[:, None]) &
+                    (distances < 0.3))
+
+            # Greedily keep candidates (in score order) not near an already kept one
+            kept = np.zeros(len(title_candidates), dtype=bool)
+            for i in range(len(title_candidates)):
+                kept[i] = not (near[i] & kept).any()
+            filtered_candidates = [c for c, keep in zip(title_candidates, kept) if keep]
 
             if filtered_candidates:
                 # Re-score and select the best candidate from the filtered list
+                max_font_size = max(c["font_size"] for c in filtered_candidates)
                 for candidate in filtered_candidates:
-                    font_score = candidate["font_size"] / max(c["font_size"] for c in filtered_candidates)
+                    font_score = candidate["font_size"] / max_font_size
                     bold_score = 1.2 if candidate["is_bold"] else 1.0
-                    semantic_score = 1.5 if is_likely_heading(candidate["text"], current_config, candidate["font_size"], page_dominant_font_sizes.get(candidate["page"] - 1, 0), is_bold(span), page_height, is_title_candidate=True) else 1.0
+                    semantic_score = 1.5 if candidate["is_heading_like"] else 1.0
                     
                     candidate["total_score"] = (
                         font_score * current_config["font_weight"] +
@@ -205,115 +378,64 @@ def extract_outline(pdf_path, config=None):
                 title = best_candidate["text"]
 
     # 2. Enhanced Heading Extraction
-    # Collect all text spans with comprehensive analysis
-    all_spans_with_pos = []
-    for page_num in range(len(doc)):
-        page = doc.load_page(page_num)
-        text_blocks = page.get_text("dict")["blocks"]
-        page_height = page.rect.height
-        page_width = page.rect.width
-        
-        for block in text_blocks:
-            if "lines" in block: 
-                for line in block["lines"]:
-                    for span in line["spans"]:
-                        bbox = span["bbox"]
-                        x_center = (bbox[0] + bbox[2]) / 2
-                        y_pos = bbox[1]
-                        
-                        # Calculate position-based features
-                        is_left_aligned = bbox[0] < page_width * 0.2
-                        is_center_aligned = abs(x_center - page_width/2) < page_width * 0.1
-                        is_top_of_page = y_pos < page_height * 0.2
-                        
-                        all_spans_with_pos.append({
-                            "text": span["text"].strip(),
-                            "size": span["size"],
-                            "flags": span["flags"],
-                            "page": page_num + 1,
-                            "bbox": bbox,
-                            "is_left_aligned": is_left_aligned,
-                            "is_center_aligned": is_center_aligned,
-                            "is_top_of_page": is_top_of_page,
-                            "x_center": x_center,
-                            "y_pos": y_pos
-                        })
-
-    # Enhanced heading detection with multi-factor analysis
+    # Enhanced heading detection with multi-factor analysis. The numeric
+    # font/bold/position factors are computed for all spans by a compiled
+    # kernel; only spans with a non-zero font score go through the text checks.
     heading_candidates = []
-    
-    for span in all_spans_with_pos:
-        text = span["text"]
-        size = span["size"]
-        page = span["page"]
-        is_bold_text = is_bold(span)
-        dominant_size = page_dominant_font_sizes.get(page - 1, 0)
-
-        # Apply ignore patterns
-        if any(re.match(pattern, text, re.IGNORECASE) for pattern in current_config["ignore_patterns"]):
+    ignore_re = _compile_ignore_patterns(tuple(current_config["ignore_patterns"]))
+
+    font_scores, level_tiers, base_scores, is_bold_arr = _score_headings(
+        np.asarray(span_sizes, dtype=np.float64),
+        np.asarray(span_flags, dtype=np.int64),
+        np.asarray(span_x0, dtype=np.float64),
+        np.asarray(span_x1, dtype=np.float64),
+        np.asarray(span_pages, dtype=np.int64),
+        np.asarray(page_dominant_font_sizes, dtype=np.float64),
+        np.asarray(page_widths, dtype=np.float64),
+        np.asarray(page_heights, dtype=np.float64),
+        current_config["h1_font_size_multiplier"],
+        current_config["h2_font_size_multiplier"],
+        current_config["h3_font_size_multiplier"],
+        h_thresholds["H1"], h_thresholds["H2"], h_thresholds["H3"],
+        current_config["min_heading_font_size_ratio"],
+    )
+
+    is_bold_list = is_bold_arr.tolist()
+    level_list = level_tiers.tolist()
+    base_score_list = base_scores.tolist()
+
+    # Hoist config lookups and bound methods out of the per-span loop
+    min_chars = current_config["min_heading_chars"]
+    max_chars = current_config["max_heading_chars"]
+    ign_match = ignore_re.match
+    classify = _is_likely_heading
+    add_candidate = heading_candidates.append
+    level_names = _LEVEL_NAMES
+
+    for i in np.flatnonzero(font_scores > 0).tolist():
+        text = span_texts[i]
+
+        # Basic filters (cheapest first), then ignore patterns
+        len_text = len(text)
+        if not text or len_text < min_chars or len_text > max_chars or text.isdigit():
             continue
 
-        # Basic filters
-        if not text or len(text) < current_config["min_heading_chars"] or text.isdigit():
-            continue
-        
-        if len(text) > current_config["max_heading_chars"]:
+        if ign_match(text):
             continue
 
-        # Multi-factor scoring for heading detection
-        font_score = 0
-
-        # Prioritize larger font sizes relative to dominant text
-        if dominant_size > 0:
-            if size >= dominant_size * current_config["h1_font_size_multiplier"]:
-                font_score = 3
-            elif size >= dominant_size * current_config["h2_font_size_multiplier"]:
-                font_score = 2
-            elif size >= dominant_size * current_config["h3_font_size_multiplier"]:
-                font_score = 1
+        size = span_sizes[i]
+        page_num = span_pages[i]
+        dominant_size = page_dominant_font_sizes[page_num]
+        semantic_bonus = 1.3 if classify(text, size, dominant_size, is_bold_list[i], False, min_chars, max_chars, ignore_re) else 1.0
         
-        # Fallback to absolute thresholds if dominant size is not useful or too small
-        if font_score == 0 and size >= current_config["min_heading_font_size_ratio"] * page_height:
-            if size >= h_thresholds["H1"]:
-                font_score = 3
-            elif size >= h_thresholds["H2"]:
-                font_score = 2
-            elif size >= h_thresholds["H3"]:
-                font_score = 1
-
-        if font_score > 0:
-            # Calculate composite score
-            bold_bonus = 1.5 if is_bold_text else 1.0
-            semantic_bonus = 1.3 if is_likely_heading(text, current_config, size, dominant_size, is_bold_text, page_height) else 1.0
-            position_bonus = 1.2 if (span["is_left_aligned"] or span["is_center_aligned"]) else 1.0
-            
-            total_score = font_score * bold_bonus * semantic_bonus * position_bonus
-            
-            # Determine heading level based on font score and relative size
-            level = "H3" # Default to H3
-            if dominant_size > 0:
-                if size >= dominant_size * current_config["h1_font_size_multiplier"]:
-                    level = "H1"
-                elif size >= dominant_size * current_config["h2_font_size_multiplier"]:
-                    level = "H2"
-                elif size >= dominant_size * current_config["h3_font_size_multiplier"]:
-                    level = "H3"
-            else: # Fallback to absolute thresholds
-                if size >= h_thresholds["H1"]:
-                    level = "H1"
-                elif size >= h_thresholds["H2"]:
-                    level = "H2"
-                elif size >= h_thresholds["H3"]:
-                    level = "H3"
-            
-            heading_candidates.append({
-                "level": level,
-                "text": text,
-                "page": page,
-                "score": total_score,
-                "font_size": size,
-                "y_pos": span["y_pos"]
-            })
+        add_candidate({
+            "level": level_names[level_list[i]],
+            "text": text,
+            "page": page_num + 1,
+            "score": base_score_list[i] * semantic_bonus,
+            "font_size": size,
+            "y_pos": span_y0[i]
+        })
 
     # Sort by page and then by y_pos to maintain document order
     heading_candidates.sort(key=lambda x: (x["page"], x["y_pos"]))
@@ -321,32 +443,37 @@ def extract_outline(pdf_path, config=None):
     # Deduplicate and finalize outline, prioritizing higher levels for same text/position
     final_outline = []
     seen_entries = set()
+    # Accepted lowercased texts bucketed by (page, level): a candidate is only
+    # compared against higher-level entries on its own page
+    accepted_texts = {}
 
     for candidate in heading_candidates:
+        text_lower = candidate["text"].lower()
+        page = candidate["page"]
+        level = candidate["level"]
+
         # Create a unique key for deduplication, considering text and approximate position
         # Use a rounded y_pos to group very close lines that might be part of the same heading
-        key = (candidate["text"].lower(), candidate["page"], round(candidate["y_pos"] / 10))
+        key = (text_lower, page, round(candidate["y_pos"] / 10))
+        if key in seen_entries:
+            continue
+
+        # Check if a higher-level heading with similar text already exists on the same page
+        is_redundant = any(
+            _text_distance(existing_text, text_lower, score_cutoff=0.2) < 0.2
+            for higher_level in _HIGHER_LEVELS[level]
+            for existing_text in accepted_texts.get((page, higher_level), ())
+        )
         
-        if key not in seen_entries:
-            # Check if a higher-level heading with similar text already exists on the same page
-            is_redundant = False
-            for existing_entry in final_outline:
-                if (existing_entry["page"] == candidate["page"] and 
-                   nltk.edit_distance(existing_entry["text"].lower(), candidate["text"].lower()) < max(len(existing_entry["text"]), len(candidate["text"])) * 0.2 and 
-                   (existing_entry["level"] == "H1" and candidate["level"] != "H1" or 
-                    existing_entry["level"] == "H2" and candidate["level"] == "H3")):
-                    is_redundant = True
-                    break
-            
-            if not is_redundant:
-                final_outline.append({
-                    "level": candidate["level"],
-                    "text": candidate["text"],
-                    "page": candidate["page"]
-                })
-                seen_entries.add(key)
+        if not is_redundant:
+            final_outline.append({
+                "level": level,
+                "text": candidate["text"],
+                "page": page
+            })
+            seen_entries.add(key)
+            accepted_texts.setdefault((page, level), []).append(text_lower)
 
-    doc.close()
     return {"title": title, "outline": final_outline}
 
 if __name__ == '__main__':
@@ -360,9 +487,9 @@ if __name__ == '__main__':
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
 
     try:
-        result = extract_outline(pdf_file)
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
+        with fitz.open(pdf_file) as doc:
+            result = extract_outline(doc)
+        write_json(output_file, result)
         print(f"Outline extracted and saved to {output_file}")
     except Exception as e:
         print(f"Error: {e}")
@@ -30,13 +30,13 @@ DEFAULT_CONFIG = {
     "title_search_pages": 5, # Number of initial pages to search for the title
     "min_title_position_score": 0.7, # Minimum position score for a title candidate
     "ignore_patterns": [
-        r"^\\d+\\.$", # Just numbers with dots
-        r"^Fig\\.\\s*\\d+", # Figure captions
-        r"^Table\\s*\\d+", # Table captions
-        r"^\\s*$", # Empty lines
-        r"^Page\\s*\\d+", # Page numbers
-        r"^\\d+\\s*$", # Just numbers
-        r"SCTR\\\s*\\\"s", # Specific header text
+        r"^\d+\.$", # Just numbers with dots
+        r"^Fig\.\s*\d+", # Figure captions
+        r"^Table\s*\d+", # Table captions
+        r"^\s*$", # Empty lines
+        r"^Page\s*\d+", # Page numbers
+        r"^\d+\s*$", # Just numbers
+        r"SCTR\s*['’\"]s", # "SCTR's" header; also accepts a curly apostrophe or double quote
         r"PUNE INSTITUTE OF COMPUTER TECHNOLOGY", # Specific header text
         r"DEPARTMENT OF INFORMATION TECHNOLOGY", # Specific footer text
     ]
@@ -8,27 +8,11 @@ Optimized for the Adobe Challenge requirements.
 import os
 import sys
 import time
-import json
-import signal
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from app import extract_outline
-
-class TimeoutError(Exception):
-    """Custom timeout exception"""
-    pass
-
-def timeout_handler(signum, frame):
-    """Handle timeout signal"""
-    raise TimeoutError("PDF processing timeout exceeded")
-
-def setup_timeout(seconds):
-    """Setup processing timeout"""
-    signal.signal(signal.SIGALRM, timeout_handler)
-    signal.alarm(seconds)
-
-def clear_timeout():
-    """Clear processing timeout"""
-    signal.alarm(0)
+import fitz  # PyMuPDF
+from app import extract_outline, write_json
 
 def validate_directories():
     """Validate input and output directories"""
@@ -57,11 +41,8 @@ def find_pdf_files(input_dir):
 def estimate_pages(pdf_path):
     """Quickly estimate number of pages for timeout calculation"""
     try:
-        import fitz
-        doc = fitz.open(str(pdf_path))
-        page_count = len(doc)
-        doc.close()
-        return page_count
+        with fitz.open(str(pdf_path)) as doc:
+            return doc.page_count
     except Exception:
         return 50  # Assume max pages if can\\'t determine
 
@@ -72,23 +53,27 @@ def calculate_timeout(page_count):
     base_timeout = max(10, (page_count / 50) * 10)
     return min(base_timeout * 1.5, 30)  # Cap at 30 seconds with 50% buffer
 
-def process_single_pdf(pdf_path, output_path, timeout_seconds=15):
-    """Process a single PDF with timeout protection"""
+def write_error_result(output_path, error_msg, processing_time):
+    """Write an empty outline carrying the error message"""
+    try:
+        error_result = {
+            "title": "",
+            "outline": [],
+            "error": error_msg,
+            "processing_time": processing_time
+        }
+        write_json(output_path, error_result)
+    except Exception as save_error:
+        print(f"  Additional error saving error result: {save_error}")
+
+def process_single_pdf(pdf_path, output_path):
+    """Process a single PDF (runs inside a worker process)"""
     start_time = time.time()
-    result = None
-    error_msg = None
     
     try:
-        # Set up timeout protection
-        setup_timeout(int(timeout_seconds))
-        
-        print(f"Processing {pdf_path.name}...", end=" ", flush=True)
-        
-        # Extract outline
-        result = extract_outline(str(pdf_path))
-        
-        # Clear timeout
-        clear_timeout()
+        # Extract outline from a single open of the document
+        with fitz.open(str(pdf_path)) as doc:
+            result = extract_outline(doc)
         
         # Validate result structure
         if not isinstance(result, dict) or "title" not in result or "outline" not in result:
@@ -99,43 +84,51 @@ def process_single_pdf(pdf_path, output_path, timeout_seconds=15):
             result["outline"] = []
         
         # Save result to JSON file with proper error handling
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
-        
-        processing_time = time.time() - start_time
-        print(f"✓ Success ({processing_time:.2f}s)")
-        
-        # Warn if processing time is concerning
-        if processing_time > 10:
-            print(f"  Warning: Processing took {processing_time:.2f}s (>10s target)")
+        write_json(output_path, result)
         
-        return True, processing_time, None
-        
-    except TimeoutError:
-        clear_timeout()
-        processing_time = time.time() - start_time
-        error_msg = f"Timeout after {processing_time:.1f}s"
-        print(f"✗ {error_msg}")
+        return True, time.time() - start_time, None
         
     except Exception as e:
-        clear_timeout()
         processing_time = time.time() - start_time
         error_msg = str(e)
-        print(f"✗ Error: {error_msg} ({processing_time:.2f}s)")
     
     # Create error result file
+    write_error_result(output_path, error_msg, processing_time)
+    
+    return False, processing_time, error_msg
+
+def terminate_pool(executor):
+    """Kill all worker processes of a pool (e.g. one stuck past its timeout)"""
+    for process in list((executor._processes or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def restart_pool(executor, futures, jobs, start, max_workers):
+    """Replace a stuck or broken pool and resubmit every file from index
+    start on that has not finished successfully"""
+    terminate_pool(executor)
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    for j in range(start, len(jobs)):
+        future = futures[j]
+        if not future.done() or future.cancelled() or future.exception() is not None:
+            futures[j] = executor.submit(process_single_pdf, jobs[j][0], jobs[j][1])
+    return executor
+
+def run_isolated(pdf_path, output_path, timeout_seconds):
+    """Rerun one PDF in its own single-worker pool, so a crash can be pinned on it"""
+    start_time = time.time()
+    executor = ProcessPoolExecutor(max_workers=1)
     try:
-        error_result = {
-            "title": "",
-            "outline": [],
-            "error": error_msg,
-            "processing_time": processing_time
-        }
-        with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(error_result, f, indent=2, ensure_ascii=False)
-    except Exception as save_error:
-        print(f"  Additional error saving error result: {save_error}")
+        return executor.submit(process_single_pdf, pdf_path, output_path).result(timeout=timeout_seconds)
+    except TimeoutError:
+        error_msg = f"Timeout after {time.time() - start_time:.1f}s"
+    except BrokenProcessPool:
+        error_msg = "Worker process crashed"
+    finally:
+        terminate_pool(executor)
     
+    processing_time = time.time() - start_time
+    write_error_result(output_path, error_msg, processing_time)
     return False, processing_time, error_msg
 
 def print_summary(results):
@@ -166,12 +159,7 @@ def print_summary(results):
 
 def validate_environment():
     """Validate the runtime environment"""
-    try:
-        import fitz
-        print(f"PyMuPDF version: {fitz.version[0]}")
-    except ImportError:
-        print("Error: PyMuPDF not installed")
-        sys.exit(1)
+    print(f"PyMuPDF version: {fitz.version[0]}")
     
     # Check available memory (basic check)
     try:
@@ -205,42 +193,76 @@ def main():
     print(f"Found {len(pdf_files)} PDF file(s) to process")
     print("-" * 50)
     
-    # Process each PDF
+    # Estimate timeouts up front (page count only, no text extraction)
+    jobs = []
+    for pdf_path in pdf_files:
+        output_filename = pdf_path.stem + ".json"
+        page_count = estimate_pages(pdf_path)
+        jobs.append((pdf_path, output_dir / output_filename, page_count, calculate_timeout(page_count)))
+    
+    # Process PDFs in parallel - each document is independent
     results = []
     
-    for i, pdf_path in enumerate(pdf_files, 1):
-        # Generate output filename
-        output_filename = pdf_path.stem + ".json"
-        output_path = output_dir / output_filename
-        
-        print(f"[{i}/{len(pdf_files)}] ", end="")
-        
-        # Estimate timeout based on file size and pages
-        try:
-            page_count = estimate_pages(pdf_path)
-            timeout_seconds = calculate_timeout(page_count)
-            print(f"({page_count} pages, {timeout_seconds:.0f}s timeout) ", end="")
-        except Exception:
-            timeout_seconds = 15
-            print("(timeout: 15s) ", end="")
-        
-        # Process the PDF
-        success, processing_time, error_msg = process_single_pdf(
-            pdf_path, output_path, timeout_seconds
-        )
-        
-        # Record result
-        results.append({
-            "filename": pdf_path.name,
-            "success": success,
-            "processing_time": processing_time,
-            "error": error_msg,
-            "output_file": output_filename
-        })
-        
-        # Add small delay between files to prevent resource exhaustion
-        if i < len(pdf_files):  # Don\\'t delay after last file
-            time.sleep(0.1)
+    max_workers = os.cpu_count()
+    executor = ProcessPoolExecutor(max_workers=max_workers)
+    futures = [
+        executor.submit(process_single_pdf, pdf_path, output_path)
+        for pdf_path, output_path, _, _ in jobs
+    ]
+    
+    try:
+        for i, (pdf_path, output_path, page_count, timeout_seconds) in enumerate(jobs):
+            print(f"[{i + 1}/{len(pdf_files)}] ({page_count} pages, {timeout_seconds:.0f}s timeout) "
+                  f"Processing {pdf_path.name}...", end=" ", flush=True)
+            
+            wait_start = time.time()
+            try:
+                try:
+                    success, processing_time, error_msg = futures[i].result(timeout=timeout_seconds)
+                except BrokenProcessPool:
+                    # A worker died (e.g. MuPDF segfault or OOM kill), which breaks
+                    # every pending future. Restart the pool for the remaining files
+                    # and rerun this one alone, so only the file that crashed fails
+                    executor = restart_pool(executor, futures, jobs, i + 1, max_workers)
+                    success, processing_time, error_msg = run_isolated(pdf_path, output_path, timeout_seconds)
+                
+                if success:
+                    print(f"✓ Success ({processing_time:.2f}s)")
+                    
+                    # Warn if processing time is concerning
+                    if processing_time > 10:
+                        print(f"  Warning: Processing took {processing_time:.2f}s (>10s target)")
+                else:
+                    print(f"✗ Error: {error_msg} ({processing_time:.2f}s)")
+            
+            except TimeoutError:
+                processing_time = time.time() - wait_start
+                success, error_msg = False, f"Timeout after {processing_time:.1f}s"
+                print(f"✗ {error_msg}")
+                
+                # The worker may be stuck inside PyMuPDF's C code, so kill the
+                # whole pool and resubmit every file that has not finished yet
+                executor = restart_pool(executor, futures, jobs, i + 1, max_workers)
+                
+                write_error_result(output_path, error_msg, processing_time)
+            
+            except Exception as e:
+                # Worker failed before it could report back
+                processing_time = time.time() - wait_start
+                success, error_msg = False, str(e)
+                print(f"✗ Error: {error_msg} ({processing_time:.2f}s)")
+                write_error_result(output_path, error_msg, processing_time)
+            
+            # Record result
+            results.append({
+                "filename": pdf_path.name,
+                "success": success,
+                "processing_time": processing_time,
+                "error": error_msg,
+                "output_file": output_path.name
+            })
+    finally:
+        executor.shutdown()
     
     # Print summary
     print_summary(results)